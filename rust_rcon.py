@@ -1,40 +1,107 @@
-import websocket
-import json
-import argparse
 import sys
 import logging
-from typing import Dict, Any
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+# Prefer orjson, then ujson, then the standard library. The helpers below
+# hide the API differences so the call sites stay the same.
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+
+    def _dumps_pretty(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    _loads = orjson.loads
+except ImportError:
+    try:
+        import ujson as json
+
+        _dumps = json.dumps
+        _loads = json.loads
+    except ImportError:
+        import json
+
+        # Reuse one encoder/decoder instead of building a new one per call.
+        _ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+        _DECODER = json.JSONDecoder()
+
+        _dumps = _ENCODER.encode
+
+        def _loads(data):
+            return _DECODER.decode(data.decode("utf-8"))
+
+    def _dumps_pretty(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+# Flush pipelined commands once this many bytes of frames are queued.
+MAX_BATCH_BYTES = 64 * 1024
 
 class RustRCONError(Exception):
     pass
 
+class RustRCONConnectError(RustRCONError):
+    pass
+
+class RustRCONAuthError(RustRCONConnectError):
+    pass
+
+class RustRCONSendError(RustRCONError):
+    def __init__(self, message: str, responses: Optional[List[Optional[Dict[str, Any]]]] = None):
+        super().__init__(message)
+        # Set by send_commands: the replies received before the failure, None where missing.
+        self.responses = responses
+
+def _classify_send_error(e: Exception) -> str:
+    import socket
+    import websocket
+
+    if isinstance(e, (websocket.WebSocketTimeoutException, socket.timeout)):
+        return "Server did not respond in time."
+    if isinstance(e, ValueError):
+        return "Received invalid JSON response from server."
+    return "Error sending command."
+
 class RustRCONClient:
     def __init__(self, host: str, port: int, password: str, verbose: bool = False):
         self.host = host
         self.port = port
         self.password = password
         self.verbose = verbose
+        self._url = f"ws://{host}:{port}/{password}"
         self.ws = None
         self.request_id = 0
+        self._msg_template = {"Identifier": 0, "Message": "", "Name": "WebRcon"}
 
-        level = logging.DEBUG if verbose else logging.INFO
-        logging.basicConfig(format='%(levelname)s: %(message)s', level=level)
         self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+        # Only a verbose client needs somewhere to print; basicConfig leaves
+        # existing logging setups alone.
+        if verbose:
+            logging.basicConfig(format='%(levelname)s: %(message)s')
 
     def connect(self):
-        url = f"ws://{self.host}:{self.port}/{self.password}"
+        import websocket
+
         try:
-            self.ws = websocket.create_connection(url, timeout=10)
-            self.logger.debug(f"Connected to {self.host}:{self.port}")
-        except websocket.WebSocketTimeoutException:
-            raise RustRCONError("Connection timed out. Check your host and port.")
+            self.ws = websocket.create_connection(
+                self._url,
+                timeout=10,
+                skip_utf8_validation=True,
+                enable_multithread=False,
+                suppress_origin=True,
+            )
+            self.logger.debug("Connected to %s:%s", self.host, self.port)
+        except websocket.WebSocketTimeoutException as e:
+            raise RustRCONConnectError("Connection timed out. Check your host and port.") from e
         except websocket.WebSocketBadStatusException as e:
             if e.status_code == 401:
-                raise RustRCONError("Authentication failed. Check your password.")
+                raise RustRCONAuthError("Authentication failed. Check your password.") from e
             else:
-                raise RustRCONError(f"Connection failed with status code: {e.status_code}")
+                raise RustRCONConnectError(f"Connection failed with status code: {e.status_code}") from e
         except Exception as e:
-            raise RustRCONError(f"Failed to connect: {str(e)}")
+            raise RustRCONConnectError("Failed to connect.") from e
 
     def disconnect(self):
         if self.ws:
@@ -42,38 +109,121 @@ class RustRCONClient:
             self.logger.debug("Disconnected from server")
             self.ws = None
 
+    def _recv(self, debug: bool) -> Dict[str, Any]:
+        # recv_data() hands back the frame payload as bytes, which the parser
+        # reads directly; copying it into a pooled buffer would only add a copy.
+        _, response = self.ws.recv_data()
+        if debug:
+            self.logger.debug("Received response: %s", response.decode("utf-8", "replace"))
+        return _loads(response)
+
     def send_command(self, command: str) -> Dict[str, Any]:
         if not self.ws:
             raise RustRCONError("Not connected to server. Call connect() first.")
 
         self.request_id += 1
-        message = json.dumps({
-            "Identifier": self.request_id,
-            "Message": command,
-            "Name": "WebRcon"
-        })
+        self._msg_template["Identifier"] = self.request_id
+        self._msg_template["Message"] = command
+        message = _dumps(self._msg_template)
         
+        debug = self.logger.isEnabledFor(logging.DEBUG)
         try:
-            self.logger.debug(f"Sending command: {command}")
+            if debug:
+                self.logger.debug("Sending command: %s", command)
             self.ws.send(message)
-            response = self.ws.recv()
-            self.logger.debug(f"Received response: {response}")
-            return json.loads(response)
-        except websocket.WebSocketTimeoutException:
-            raise RustRCONError("Server did not respond in time.")
-        except json.JSONDecodeError:
-            raise RustRCONError("Received invalid JSON response from server.")
+            # Skip unsolicited console/chat frames until our reply arrives.
+            while True:
+                response = self._recv(debug)
+                if response.get("Identifier") == self.request_id:
+                    return response
         except Exception as e:
-            raise RustRCONError(f"Error sending command: {str(e)}")
+            raise RustRCONSendError(_classify_send_error(e)) from e
 
-def main():
-    parser = argparse.ArgumentParser(description="RCON client for Rust using WebSockets")
+    def _flush_batch(self, frames: List[bytes], ids: List[int], replies: Dict[int, Dict[str, Any]], debug: bool):
+        # Each command keeps its own frame so the server parses it as usual,
+        # but the whole batch goes out in a single write.
+        self.ws.sock.sendall(b"".join(frames))
+
+        # A reply that fails to parse is counted against the batch and the rest
+        # are still drained, so only that command is left without a reply.
+        waiting = set(ids)
+        parse_error = None
+        malformed = 0
+        while len(waiting) > malformed:
+            try:
+                response = self._recv(debug)
+            except ValueError as e:
+                parse_error = e
+                malformed += 1
+                continue
+            identifier = response.get("Identifier")
+            if identifier in waiting:
+                waiting.discard(identifier)
+                replies[identifier] = response
+        if parse_error is not None:
+            raise parse_error
+
+    def send_commands(self, commands: List[str]) -> List[Dict[str, Any]]:
+        if not self.ws:
+            raise RustRCONError("Not connected to server. Call connect() first.")
+        import websocket
+
+        first_id = self.request_id + 1
+        replies = {}
+        frames = []
+        ids = []
+        batch_bytes = 0
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+
+        try:
+            for command in commands:
+                self.request_id += 1
+                self._msg_template["Identifier"] = self.request_id
+                self._msg_template["Message"] = command
+                message = _dumps(self._msg_template)
+                frame = websocket.ABNF.create_frame(message, websocket.ABNF.OPCODE_TEXT).format()
+                if debug:
+                    self.logger.debug("Queueing command: %s", command)
+
+                if frames and batch_bytes + len(frame) > MAX_BATCH_BYTES:
+                    self._flush_batch(frames, ids, replies, debug)
+                    frames = []
+                    ids = []
+                    batch_bytes = 0
+                frames.append(frame)
+                ids.append(self.request_id)
+                batch_bytes += len(frame)
+
+            if frames:
+                self._flush_batch(frames, ids, replies, debug)
+            return [replies[first_id + i] for i in range(len(commands))]
+        except Exception as e:
+            responses = [replies.get(first_id + i) for i in range(len(commands))]
+            raise RustRCONSendError(_classify_send_error(e), responses) from e
+
+def _write_stdout(data: bytes):
+    # Bypass the text layer; flush it first so earlier print() output stays in order.
+    sys.stdout.flush()
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.write(b"\n")
+    # Match print()'s behaviour on a terminal so REPL replies show up immediately.
+    if sys.stdout.line_buffering:
+        sys.stdout.buffer.flush()
+
+def _parse_args():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="RCON client for Rust using WebSockets",
+        epilog="For quick one-off commands, 'rust_rcon.py --fast HOST PORT PASSWORD COMMAND...' skips option parsing.",
+    )
     parser.add_argument("-H", "--host", required=True, help="Server hostname or IP address")
     parser.add_argument("-P", "--port", type=int, required=True, help="Server RCON port")
     parser.add_argument("-p", "--password", required=True, help="RCON password")
-    parser.add_argument("-c", "--command", required=True, help="Command to execute (use quotes for commands with spaces)")
+    parser.add_argument("-c", "--command", action="append", help="Command to execute (use quotes for commands with spaces); repeat to send several commands in one batch, or pass - to read commands from stdin. Required unless --repl is given")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
     parser.add_argument("--raw", action="store_true", help="Print raw JSON response")
+    parser.add_argument("--repl", action="store_true", help="Read commands from stdin, one per line, over a single connection (cannot be combined with -c)")
     parser.add_argument("--retry", type=int, default=3, help="Number of connection retry attempts")
     
     try:
@@ -82,31 +232,122 @@ def main():
         print(f"Argument error: {str(e)}")
         sys.exit(1)
 
-    client = RustRCONClient(args.host, args.port, args.password, args.verbose)
+    if not args.repl and not args.command:
+        parser.error("the following arguments are required: -c/--command")
+    if args.repl and args.command and args.command != ["-"]:
+        parser.error("argument --repl: not allowed with -c/--command")
+    if args.command and "-" in args.command and args.command != ["-"]:
+        parser.error("argument -c/--command: '-' cannot be combined with other commands")
+    if args.retry < 1:
+        parser.error("argument --retry: must be at least 1")
+    return args
+
+def _parse_fast(argv):
+    # argv is HOST PORT PASSWORD COMMAND...; skips building the argparse parser.
+    usage = "usage: rust_rcon.py --fast HOST PORT PASSWORD COMMAND..."
+    if len(argv) < 4:
+        print(usage, file=sys.stderr)
+        sys.exit(2)
+    try:
+        port = int(argv[1])
+    except ValueError:
+        print(usage, file=sys.stderr)
+        print(f"rust_rcon.py: error: invalid port: {argv[1]!r}", file=sys.stderr)
+        sys.exit(2)
+    return SimpleNamespace(host=argv[0], port=port, password=argv[2], command=[" ".join(argv[3:])],
+                           verbose=False, raw=False, repl=False, retry=3)
 
-    for attempt in range(args.retry):
+def _with_retries(client: RustRCONClient, retries: int, action):
+    for attempt in range(retries):
         try:
-            client.connect()
-            response = client.send_command(args.command)
-            
-            if args.raw:
-                print(json.dumps(response, indent=2))
-            else:
-                print("Server response:")
-                print(response.get('Message', 'No message in response'))
-            break
+            if attempt:
+                import random
+                import time
+
+                time.sleep(min(2 ** attempt, 30) * random.uniform(0.5, 1.5))
+            if client.ws is None:
+                client.connect()
+            return action()
         except RustRCONError as e:
-            print(f"RCON Error (Attempt {attempt + 1}/{args.retry}): {str(e)}")
-            if attempt == args.retry - 1:
+            if e.__cause__:
+                print(f"RCON Error (Attempt {attempt + 1}/{retries}): {e} (caused by {e.__cause__!r})")
+            else:
+                print(f"RCON Error (Attempt {attempt + 1}/{retries}): {e}")
+            # A wrong password will not fix itself, so don't retry it.
+            if attempt == retries - 1 or isinstance(e, RustRCONAuthError):
                 sys.exit(1)
-        except KeyboardInterrupt:
-            print("\nOperation interrupted by user.")
-            break
-        except Exception as e:
-            print(f"An unexpected error occurred: {str(e)}")
-            sys.exit(1)
+            # Only a malformed reply leaves the socket usable. After a transport
+            # error it is likely dead, and after a timeout the late reply is still
+            # queued, so reconnect.
+            if not isinstance(e.__cause__, ValueError):
+                client.disconnect()
+
+def _send_batch(client: RustRCONClient, retries: int, commands: List[str]) -> List[Dict[str, Any]]:
+    responses = [None] * len(commands)
+
+    # Retries only resend commands that have no reply yet. A command whose
+    # reply was lost or malformed may still have run on the server.
+    def send_pending():
+        pending = [i for i, response in enumerate(responses) if response is None]
+        replies = []
+        try:
+            replies = client.send_commands([commands[i] for i in pending])
+        except RustRCONSendError as e:
+            replies = e.responses or []
+            raise
         finally:
-            client.disconnect()
+            for i, reply in zip(pending, replies):
+                if reply is not None:
+                    responses[i] = reply
+
+    _with_retries(client, retries, send_pending)
+    return responses
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--fast":
+        args = _parse_fast(sys.argv[2:])
+    else:
+        args = _parse_args()
+
+    logging.basicConfig(format='%(levelname)s: %(message)s')
+
+    repl = args.repl or args.command == ["-"]
+
+    client = RustRCONClient(args.host, args.port, args.password, args.verbose)
+
+    try:
+        if repl:
+            # Each line gets its own retry budget, and a failed command is
+            # retried rather than skipped.
+            for line in sys.stdin:
+                command = line.rstrip()
+                if not command:
+                    continue
+                response = _with_retries(client, args.retry, lambda: client.send_command(command))
+                if args.raw:
+                    _write_stdout(_dumps_pretty(response))
+                else:
+                    _write_stdout(response.get('Message', '').encode("utf-8", errors="replace"))
+            return
+
+        if len(args.command) == 1:
+            responses = [_with_retries(client, args.retry, lambda: client.send_command(args.command[0]))]
+        else:
+            responses = _send_batch(client, args.retry, args.command)
+
+        for response in responses:
+            if args.raw:
+                _write_stdout(_dumps_pretty(response))
+            else:
+                _write_stdout(b"Server response:")
+                _write_stdout(response.get('Message', 'No message in response').encode("utf-8", errors="replace"))
+    except KeyboardInterrupt:
+        print("\nOperation interrupted by user.")
+    except Exception as e:
+        print(f"An unexpected error occurred: {str(e)}")
+        sys.exit(1)
+    finally:
+        client.disconnect()
 
 if __name__ == "__main__":
     main()